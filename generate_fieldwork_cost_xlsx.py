@@ -9,11 +9,26 @@ Usage
 -----
 Run the script directly::
 
-    python generate_fielwork_cost_xlsx.py
+    python generate_fieldwork_cost_xlsx.py
 
 This produces ``/output/fieldtrip-cost-template.xlsx``. Open the file and
 fill in **Inputs & Rates** first; all other sheets reference those values.
 
+Only as many rows as needed are pre-filled with formulas. Adjust the row
+counts per sheet with ``--staff-rows`` (default 20), ``--hours-rows``
+(default 100), ``--travel-rows`` (default 30), and ``--material-rows``
+(default 30)::
+
+    python generate_fieldwork_cost_xlsx.py --staff-rows 40 --hours-rows 250
+
+The generator can also be used as a library, e.g. to serve the workbook
+from a web application; importing the module does not build or write
+anything::
+
+    from generate_fieldwork_cost_xlsx import Config, build_workbook
+
+    build_workbook(Config(staff_rows=40), response_stream)
+
 Sheets created
 --------------
 - **Inputs & Rates**: Centralized parameters (per-diem full/partial,
@@ -23,8 +38,9 @@ Sheets created
   WiMi, Lab (VA), Hiwi (student assistant), Student (unpaid). Calculates
   per-diems (no meal deductions), overnights, hours-based wages for Hiwis,
   and participant subtotals.
-- **Hours Log**: Date, task, first/last name, hours. Aggregated back to
-  **Staff & Participants** via ``SUMIFS`` (names must match exactly).
+- **Hours Log**: Date, task, first/last name, hours. A helper column joins
+  first and last name into a key that **Staff & Participants** totals via
+  ``SUMIF`` (names must match exactly).
 - **Travel & Vehicles**: Tickets/day-rates, rental-car variable costs
   (km x per-km), private-car reimbursement (km x rate). The private-car
   trip-level cap is applied in **Summary**.
@@ -43,323 +59,573 @@ your institution and the specific grant documents.
 Dependencies
 ------------
 - Python 3.9+ (recommended)
-- ``openpyxl`` for workbook creation
+- ``openpyxl>=3.1`` for workbook creation
 
 Side effects
 ------------
 Writes ``/output/fieldtrip-cost-template.xlsx`` to the current directory
-when executed as a script.
+only when executed as a script (``main()``). Importing the module has no
+side effects.
 """
 
+import argparse
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
 from pathlib import Path
+from xml.sax.saxutils import escape
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.datavalidation import DataValidation
 from openpyxl.workbook.defined_name import DefinedName
+from openpyxl.writer.excel import ExcelWriter
 
 def add_defined_name(wb, sheet_title: str, name: str, a1_ref: str) -> None:
     """
     Create/replace a workbook-level defined name pointing to a cell/range.
-    Works across openpyxl variants where defined_names is list-like or dict-like.
+    Requires openpyxl >= 3.1, where defined_names is dict-like.
     """
     target = f"'{sheet_title}'!{a1_ref}" if " " in sheet_title else f"{sheet_title}!{a1_ref}"
+    wb.defined_names[name] = DefinedName(name=name, attr_text=target)
 
-    delete = getattr(wb.defined_names, "delete", None)
-    if callable(delete):
-        try:
-            delete(name)
-        except Exception:
-            pass
-    else:
-        try:
-            if name in wb.defined_names:
-                del wb.defined_names[name]
-        except Exception:
-            for dn in list(getattr(wb.defined_names, "__iter__", lambda: [])()):
-                if getattr(dn, "name", None) == name:
-                    try:
-                        wb.defined_names.remove(dn)
-                    except Exception:
-                        pass
-
-    dn = DefinedName(name=name, attr_text=target)
-    if hasattr(wb.defined_names, "append"):
-        wb.defined_names.append(dn)
-    elif hasattr(wb.defined_names, "__setitem__"):
-        wb.defined_names[name] = dn
-    elif hasattr(wb.defined_names, "add"):
-        wb.defined_names.add(dn)
-    else:
-        raise RuntimeError("Unsupported openpyxl defined_names container")
 
+@dataclass(frozen=True)
+class Config:
+    """
+    Number of rows pre-filled with formulas per sheet.
+
+    Row 1 of every sheet holds the headers. Each formula sheet keeps one spare
+    row below the data (still inside the SUM ranges) before its totals row.
+    """
+    staff_rows: int = 20
+    hours_rows: int = 100
+    travel_rows: int = 30
+    material_rows: int = 30
+
+    def __post_init__(self):
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value < 1:
+                raise ValueError(f"{field.name} must be a positive row count, got {value}")
+
+    @property
+    def staff_last(self) -> int:
+        return 1 + self.staff_rows
+
+    @property
+    def hours_last(self) -> int:
+        return 1 + self.hours_rows
+
+    @property
+    def travel_last(self) -> int:
+        return 1 + self.travel_rows
+
+    @property
+    def other_last(self) -> int:
+        return 1 + self.material_rows
+
+    @property
+    def staff_tot(self) -> int:
+        return self.staff_last + 2
+
+    @property
+    def travel_tot(self) -> int:
+        return self.travel_last + 2
+
+    @property
+    def other_tot(self) -> int:
+        return self.other_last + 2
 
-wb = Workbook()
 
 # ------------------------------
-# Styles & helpers
+# Styles & helpers (shared instances, reused by reference)
 # ------------------------------
 header_fill = PatternFill("solid", fgColor="F2F2F2")
 bold = Font(bold=True)
+title_font = Font(bold=True, size=14)
+center_align = Alignment(horizontal="center")
+vcenter_align = Alignment(vertical="center")
 thin = Side(style="thin", color="CCCCCC")
 border_all = Border(left=thin, right=thin, top=thin, bottom=thin)
 
-def make_header(row):
-    for c in row:
+# Cells only need the currency number format; assigning it directly skips
+# the by-name lookup of the "currency" NamedStyle for every cell.
+CURRENCY_FMT = '#,##0.00_);[Red](#,##0.00)'
+
+# Column letters A..AF, indexed from 0 (COLS[c - 1] for 1-based column c)
+COLS = tuple(get_column_letter(i) for i in range(1, 33))
+
+def _named_styles():
+    """Return fresh named styles; add_named_style() binds each one to its workbook."""
+    currency = NamedStyle(name="currency")
+    currency.number_format = CURRENCY_FMT
+    percent = NamedStyle(name="percent")
+    percent.number_format = '0%'
+    return currency, percent
+
+def make_header(ws, values):
+    """Return a row of styled write-only header cells for ``ws``."""
+    row = []
+    for v in values:
+        c = WriteOnlyCell(ws, value=v)
         c.font = bold
         c.fill = header_fill
-        c.alignment = Alignment(vertical="center")
+        c.alignment = vcenter_align
         c.border = border_all
+        row.append(c)
+    return row
+
+def append_row(ws, values, styled=(), number_format=CURRENCY_FMT):
+    """
+    Append ``values`` as a single row. Only the 1-based columns listed in
+    ``styled`` are wrapped in cells carrying ``number_format``; all other
+    values are passed as-is.
+    """
+    row = list(values)
+    for col in styled:
+        c = WriteOnlyCell(ws, value=row[col - 1])
+        c.number_format = number_format
+        row[col - 1] = c
+    ws.append(row)
 
 def set_col_width(ws, widths):
-    for idx, w in enumerate(widths, start=1):
-        ws.column_dimensions[get_column_letter(idx)].width = w
-
-currency = NamedStyle(name="currency")
-currency.number_format = '#,##0.00_);[Red](#,##0.00)'
-percent = NamedStyle(name="percent")
-percent.number_format = '0%'
-try:
-    wb.add_named_style(currency)
-except ValueError:
-    pass
-try:
-    wb.add_named_style(percent)
-except ValueError:
-    pass
+    for idx, w in enumerate(widths):
+        ws.column_dimensions[COLS[idx]].width = w
+
+# The formula rows of Staff, Hours Log, Travel and Material are plain,
+# row-numbered text. They bypass openpyxl's cell objects: rows are rendered
+# as sheet XML and spliced into the saved workbook by write_workbook().
+
+def style_id(ws, number_format=None, font=None):
+    """Register a cell style with the workbook of ``ws`` and return its ``cellXfs`` index."""
+    c = WriteOnlyCell(ws)
+    if number_format is not None:
+        c.number_format = number_format
+    if font is not None:
+        c.font = font
+    return c.style_id
+
+def row_xml(r, cells):
+    """
+    Render sheet row ``r`` as a ``<row>`` element from ``(column, value, style_id)``
+    triples. Values starting with ``=`` are written as formulas, others as text.
+    """
+    parts = [f'<row r="{r}">']
+    append = parts.append
+    for col, value, s in cells:
+        attrs = f'r="{COLS[col - 1]}{r}"' + (f' s="{s}"' if s else "")
+        if value.startswith("="):
+            append(f"<c {attrs}><f>{escape(value[1:])}</f><v></v></c>")
+        else:
+            append(f'<c {attrs} t="inlineStr"><is><t>{escape(value)}</t></is></c>')
+    append("</row>")
+    return "".join(parts)
+
+# Deflate level of the final archive: level 3 saves roughly half the
+# compression time of zlib's default (6) for a ~15% larger file.
+ZIP_COMPRESSLEVEL = 3
+
+def write_workbook(wb, out, bodies, compresslevel=ZIP_COMPRESSLEVEL):
+    """
+    Serialise ``wb`` to ``out`` (a file path or a writable binary stream such
+    as an HTTP response body), appending the XML rows in ``bodies``
+    (``{worksheet: iterable of row_xml strings}``) to each sheet's data.
+    A path is replaced atomically once the complete file has been written.
+
+    openpyxl writes an uncompressed archive to memory; every part is deflated
+    once, while being copied into the final archive.
+    """
+    staged = io.BytesIO()
+    wb.properties.modified = datetime.now(timezone.utc).replace(tzinfo=None)
+    ExcelWriter(wb, ZipFile(staged, "w", ZIP_STORED, allowZip64=True)).save()
+
+    parts = {ws.path.lstrip("/"): rows for ws, rows in bodies.items()}
+    buf = out if hasattr(out, "write") else io.BytesIO()
+    with ZipFile(staged) as src, \
+            ZipFile(buf, "w", ZIP_DEFLATED, allowZip64=True, compresslevel=compresslevel) as dst:
+        for name in src.namelist():
+            data = src.read(name)
+            rows = parts.get(name)
+            if rows is not None:
+                head, tail = data.split(b"</sheetData>", 1)
+                data = b"".join((head, "".join(rows).encode("utf-8"), b"</sheetData>", tail))
+            dst.writestr(name, data)
+    if buf is not out:
+        # Write next to the target and rename on success, so an interrupted
+        # run never leaves a truncated workbook under the final name.
+        out = Path(out)
+        tmp = out.with_name(out.name + ".part")
+        try:
+            tmp.write_bytes(buf.getvalue())
+            os.replace(tmp, out)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+
+# ------------------------------
+# Row formula templates (``{r}`` is the sheet row, ``{h}`` the last Hours Log row)
+# ------------------------------
+# Plain products need no IFERROR: Excel treats blank cells as 0. Only the
+# Hours Log lookup keeps its IFERROR guard.
+PERDIEM_TMPL = '=IF(C{r}="Student (unpaid)",0,F{r}*PER_DIEM + G{r}*PER_DIEM)'
+OVERNIGHT_TOTAL_TMPL = "=I{r}*J{r}"
+HOURS_TMPL = "=IFERROR(SUMIF('Hours Log'!$G$2:$G${h},A{r}&\"|\"&B{r},'Hours Log'!$F$2:$F${h}),0)"
+NAME_KEY_TMPL = '=IF(AND(C{r}="",D{r}=""),"",C{r}&"|"&D{r})'
+HOURLY_RATE_TMPL = '=IF(C{r}="Hiwi (student assistant)",HIWI_RATE,0)'
+WAGES_TMPL = "=L{r}*M{r}"
+STAFF_SUBTOTAL_TMPL = "=H{r}+K{r}+O{r}"
+LINE_ITEM_TMPL = "=D{r}*E{r}"
+TRAVEL_SUBTOTAL_TMPL = "=F{r}+I{r}+K{r}"
 
 # ------------------------------
 # Sheet: Inputs & Rates
 # ------------------------------
-rates = wb.active
-rates.title = "Inputs & Rates"
-
-rates.append(["Item", "Value (EUR)", "Notes"])
-make_header(rates[1])
-
-rate_rows = [
-    ("Per diem - full day (domestic)", 24, "Defaults to EUR 24 per full day"),
-    ("Stadtmobil base rate", 150, "Set to average base rate in EUR for all Stadtmobil rentals"),
-    ("Number of Stadtmobil cars", 1, "Define number of rented cars"),
-    ("Total trip kilometers", 100, "Define the sum of all km per car"),
-    ("Stadtmobil per-km cost (incl. fuel)", 0.35, "Planning value only; adjust to Stadtmobil rate for relevant cars"),
-    ("Alternative - Stadtmobil lump sum", 0, "Enter a lump sum in EUR for all Stadtmobil rentals (e.g., for post-cost assessment)"),
-    ("Default overnight cost per night", 95, "Planning cap or expected average incl. taxes; edit per trip"),
-    ("Hiwi hourly rate (default)", 20.00, "Accounts for future wage raises"),
-]
-for r in rate_rows:
-    rates.append(list(r))
-
-# Style numeric cells
-for r in range(2, 2+len(rate_rows)):
-    label = str(rates.cell(row=r, column=1).value).lower()
-    if any(k in label for k in ["per diem", "base rate", "overnight", "per-km", "hourly rate", "lump sum"]):
-        rates.cell(row=r, column=2).style = "currency"
-
-set_col_width(rates, [40, 18, 70])
-
-# Named ranges for easy formulas (pass CELL A1 refs only!)
-for nm, a1 in {
-    "PER_DIEM": "$B$2",
-    "STADTMOBIL_BASE": "$B$3",
-    "STADTMOBIL_CAR_NUMBER": "$B$4",
-    "TOTAL_KM": "$B$5",
-    "STADTMOBIL_PER_KM": "$B$6",
-    "STADTMOBIL_LUMPSUM": "$B$7",
-    "OVERNIGHT_DEFAULT": "$B$8",
-    "HIWI_RATE": "$B$9",
-}.items():
-    add_defined_name(wb, "Inputs & Rates", nm, a1)
+# Write-only sheets stream rows on append: column widths, panes, and
+# styles must be in place before the first row is written.
+def add_rates_sheet(wb):
+    rates = wb.create_sheet("Inputs & Rates")
+    set_col_width(rates, [40, 18, 70])
+
+    rates.append(make_header(rates, ["Item", "Value (EUR)", "Notes"]))
+
+    rate_rows = [
+        ("Per diem - full day (domestic)", 24, "Defaults to EUR 24 per full day"),
+        ("Stadtmobil base rate", 150, "Set to average base rate in EUR for all Stadtmobil rentals"),
+        ("Number of Stadtmobil cars", 1, "Define number of rented cars"),
+        ("Total trip kilometers", 100, "Define the sum of all km per car"),
+        ("Stadtmobil per-km cost (incl. fuel)", 0.35, "Planning value only; adjust to Stadtmobil rate for relevant cars"),
+        ("Alternative - Stadtmobil lump sum", 0, "Enter a lump sum in EUR for all Stadtmobil rentals (e.g., for post-cost assessment)"),
+        ("Default overnight cost per night", 95, "Planning cap or expected average incl. taxes; edit per trip"),
+        ("Hiwi hourly rate (default)", 20.00, "Accounts for future wage raises"),
+    ]
+    for label, value, note in rate_rows:
+        # Style numeric cells (cells cannot be revisited once a row is streamed)
+        is_money = any(k in label.lower() for k in ["per diem", "base rate", "overnight", "per-km", "hourly rate", "lump sum"])
+        append_row(rates, [label, value, note], styled=(2,) if is_money else ())
+
+    # Named ranges for easy formulas (pass CELL A1 refs only!)
+    for nm, a1 in {
+        "PER_DIEM": "$B$2",
+        "STADTMOBIL_BASE": "$B$3",
+        "STADTMOBIL_CAR_NUMBER": "$B$4",
+        "TOTAL_KM": "$B$5",
+        "STADTMOBIL_PER_KM": "$B$6",
+        "STADTMOBIL_LUMPSUM": "$B$7",
+        "OVERNIGHT_DEFAULT": "$B$8",
+        "HIWI_RATE": "$B$9",
+    }.items():
+        add_defined_name(wb, "Inputs & Rates", nm, a1)
+    return rates
 
 # ------------------------------
 # Sheet: Staff & Participants
 # ------------------------------
-staff = wb.create_sheet("Staff & Participants")
-staff_headers = [
-    "First name","Last name","Role (WiMi/VA/Hiwi/Unpaid graduating student)",
-    "Trip start (date/time)","Trip end (date/time)",
-    "Full-day count","Partial-day count (>8h or arr/dep)",
-    "Per-diem total (EUR)",
-    "Nights","Overnight cost per night (EUR)","Overnight total (EUR)",
-    "Hours (from Hours Log)","Hourly rate (EUR)","Wages total (EUR)",
-    "Participant subtotal (EUR)"
-]
-staff.append(staff_headers); make_header(staff[1])
-set_col_width(staff, [16,16,30,20,20,16,22,18,10,22,18,22,16,12,18,20])
-
-# Role dropdown
-dv_role = DataValidation(
-    type="list",
-    formula1='"WiMi,Lab (VA),Hiwi (student assistant),Student (unpaid)"',
-    allow_blank=True
-)
-staff.add_data_validation(dv_role)
-dv_role.add("C2:C300")
-
-for row in range(2, 301):
-    # Per-diem total:
-    # - WiMi & Hiwi: normal per-diem (full + partial, same rate as per your setup)
-    # - Student (unpaid): NO per-diem -> 0
-    staff.cell(row=row, column=8).value = (
-        f"=IF(C{row}=\"Student (unpaid)\",0,IFERROR(F{row}*PER_DIEM + G{row}*PER_DIEM,0))"
+def add_staff_sheet(wb, cfg):
+    staff = wb.create_sheet("Staff & Participants")
+    staff_headers = [
+        "First name","Last name","Role (WiMi/VA/Hiwi/Unpaid graduating student)",
+        "Trip start (date/time)","Trip end (date/time)",
+        "Full-day count","Partial-day count (>8h or arr/dep)",
+        "Per-diem total (EUR)",
+        "Nights","Overnight cost per night (EUR)","Overnight total (EUR)",
+        "Hours (from Hours Log)","Hourly rate (EUR)","Wages total (EUR)",
+        "Participant subtotal (EUR)"
+    ]
+    set_col_width(staff, [16,16,30,20,20,16,22,18,10,22,18,22,16,12,18,20])
+    staff.freeze_panes = "A2"
+    staff.append(make_header(staff, staff_headers))
+
+    # Role dropdown over the pre-filled rows
+    # (write-only sheets expose the validation list directly)
+    dv_role = DataValidation(
+        type="list",
+        formula1='"WiMi,Lab (VA),Hiwi (student assistant),Student (unpaid)"',
+        allow_blank=True,
+        sqref=f"C2:C{cfg.staff_last}",
     )
-    staff.cell(row=row, column=8).style = "currency"
-
-    # Overnight default and total
-    staff.cell(row=row, column=10).value = "=OVERNIGHT_DEFAULT"
-    staff.cell(row=row, column=10).style = "currency"
-    staff.cell(row=row, column=11).value = f"=IFERROR(I{row}*J{row},0)"
-    staff.cell(row=row, column=11).style = "currency"
-
-    # Hours auto-summed from Hours Log by first & last name
-    staff.cell(row=row, column=12).value = (
-        f"=IFERROR(SUMIFS('Hours Log'!$F$2:$F$1000,'Hours Log'!$B$2:$B$1000,A{row},'Hours Log'!$C$2:$C$1000,B{row}),0)"
+    staff.data_validations.append(dv_role)
+    return staff
+
+def staff_rows_xml(cfg, currency_id, bold_id):
+    """Yield the Staff & Participants formula rows and the totals row as XML."""
+    # Bind the per-row callables and constants to locals (LOAD_FAST in the loop)
+    render, cur, h = row_xml, currency_id, cfg.hours_last
+    perdiem, overnight, hours, rate, wages, subtotal = (
+        PERDIEM_TMPL.format, OVERNIGHT_TOTAL_TMPL.format, HOURS_TMPL.format,
+        HOURLY_RATE_TMPL.format, WAGES_TMPL.format, STAFF_SUBTOTAL_TMPL.format,
     )
-
-    # Hiwi hourly rate; others 0
-    staff.cell(row=row, column=13).value = f"=IF(C{row}=\"Hiwi (student assistant)\",HIWI_RATE,0)"
-    staff.cell(row=row, column=13).style = "currency"
-
-
-    # Wages total = Hours * Rate
-    staff.cell(row=row, column=15).value = f"=IFERROR(L{row}*M{row},0)"
-    staff.cell(row=row, column=15).style = "currency"
-
-    # Subtotal = Per-diem + Overnight + Wages
-    staff.cell(row=row, column=16).value = f"=H{row}+K{row}+O{row}"
-    staff.cell(row=row, column=16).style = "currency"
-
-# Totals row
-tot_row = 302
-staff.cell(row=tot_row, column=7, value="Totals:").font = bold
-for c in (8,11,12,15,16):
-    staff.cell(row=tot_row, column=c, value=f"=SUM({get_column_letter(c)}2:{get_column_letter(c)}301)")
-    if c != 12:
-        staff.cell(row=tot_row, column=c).style = "currency"
-
-staff.freeze_panes = "A2"
+    for row in range(2, cfg.staff_last + 1):
+        # H  Per-diem total:
+        #    - WiMi & Hiwi: normal per-diem (full + partial, same rate as per your setup)
+        #    - Student (unpaid): NO per-diem -> 0
+        # J/K Overnight default and total
+        # L  Hours auto-summed from Hours Log by the "first|last" name key
+        # M  Hiwi hourly rate; others 0
+        # O  Wages total = Hours * Rate
+        # P  Subtotal = Per-diem + Overnight + Wages
+        yield render(row, (
+            (8, perdiem(r=row), cur),
+            (10, "=OVERNIGHT_DEFAULT", cur),
+            (11, overnight(r=row), cur),
+            (12, hours(r=row, h=h), 0),
+            (13, rate(r=row), cur),
+            (15, wages(r=row), cur),
+            (16, subtotal(r=row), cur),
+        ))
+
+    # Totals row (after one empty spare row)
+    totals = [(7, "Totals:", bold_id)]
+    for c in (8,11,12,15,16):
+        col = COLS[c - 1]
+        totals.append((c, f"=SUM({col}2:{col}{cfg.staff_tot - 1})", 0 if c == 12 else currency_id))
+    yield row_xml(cfg.staff_tot, totals)
 
 # ------------------------------
 # Sheet: Hours Log
 # ------------------------------
-hours = wb.create_sheet("Hours Log")
-hours_headers = ["Date","Task/Activity","First name","Last name","Role (opt.)","Hours"]
-hours.append(hours_headers); make_header(hours[1])
-set_col_width(hours, [12,36,16,16,18,10])
-
-dv_hours = DataValidation(type="decimal", operator="greaterThanOrEqual", formula1="0", allow_blank=True)
-hours.add_data_validation(dv_hours)
-dv_hours.add("F2:F1000")
-hours.freeze_panes = "A2"
+def add_hours_sheet(wb, cfg):
+    hours = wb.create_sheet("Hours Log")
+    hours_headers = ["Date","Task/Activity","First name","Last name","Role (opt.)","Hours","Name key (auto)"]
+    set_col_width(hours, [12,36,16,16,18,10,24])
+    hours.freeze_panes = "A2"
+    hours.append(make_header(hours, hours_headers))
+
+    dv_hours = DataValidation(type="decimal", operator="greaterThanOrEqual", formula1="0", allow_blank=True,
+                              sqref=f"F2:F{cfg.hours_last}")
+    hours.data_validations.append(dv_hours)
+    return hours
+
+def hours_rows_xml(cfg, currency_id, bold_id):
+    """
+    Yield the Hours Log helper rows as XML: column G joins first and last
+    name, so Staff & Participants can total hours with a single-key SUMIF.
+    Rows without a name get an empty key so they never match a blank staff row.
+    """
+    render, name_key = row_xml, NAME_KEY_TMPL.format
+    for row in range(2, cfg.hours_last + 1):
+        yield render(row, ((7, name_key(r=row), 0),))
 
 # ------------------------------
 # Sheet: Travel & Vehicles
 # ------------------------------
-travel = wb.create_sheet("Travel & Vehicles")
-travel_headers = [
-    "Date","Type (Train/Flight/Rental/Private/Taxi/PT)","Route / Purpose / Notes",
-    "Ticket/Day rate (EUR)","Qty (days / tickets)","Line item (EUR)",
-    "Rental km (estimate)","Rental per-km (EUR)","Rental variable (EUR)",
-    "Private-car km","Private-car reimb. (EUR)","Travel subtotal (EUR)"
-]
-travel.append(travel_headers); make_header(travel[1])
-set_col_width(travel, [12,18,36,16,14,16,18,16,16,16,18,18])
-
-dv_type = DataValidation(type="list", formula1='"Train,Flight,Rental,Private,Taxi,Public Transport,Other"', allow_blank=True)
-travel.add_data_validation(dv_type)
-dv_type.add("B2:B500")
-
-for row in range(2, 501):
-    # Keep line items for tickets/day-rates
-    travel.cell(row=row, column=6).value = f"=IFERROR(D{row}*E{row},0)"
-    travel.cell(row=row, column=6).style = "currency"
-
-    # We compute Stadtmobil centrally in Summary via the named rates; avoid double counting here:
-    travel.cell(row=row, column=8).value = ""           # Rental per-km left blank
-    travel.cell(row=row, column=9).value = "=0"         # Rental variable suppressed
-    travel.cell(row=row, column=11).value = "=0"        # Private car suppressed
-
-    travel.cell(row=row, column=12).value = f"=F{row}+I{row}+K{row}"
-    travel.cell(row=row, column=12).style = "currency"
-
-t_tot = 502
-travel.cell(row=t_tot, column=3, value="Totals:").font = bold
-for c in (6,9,11,12):
-    travel.cell(row=t_tot, column=c, value=f"=SUM({get_column_letter(c)}2:{get_column_letter(c)}501)")
-    travel.cell(row=t_tot, column=c).style = "currency"
-travel.freeze_panes = "A2"
+def add_travel_sheet(wb, cfg):
+    travel = wb.create_sheet("Travel & Vehicles")
+    travel_headers = [
+        "Date","Type (Train/Flight/Rental/Private/Taxi/PT)","Route / Purpose / Notes",
+        "Ticket/Day rate (EUR)","Qty (days / tickets)","Line item (EUR)",
+        "Rental km (estimate)","Rental per-km (EUR)","Rental variable (EUR)",
+        "Private-car km","Private-car reimb. (EUR)","Travel subtotal (EUR)"
+    ]
+    set_col_width(travel, [12,18,36,16,14,16,18,16,16,16,18,18])
+    travel.freeze_panes = "A2"
+    travel.append(make_header(travel, travel_headers))
+
+    # Type dropdown over the pre-filled rows
+    dv_type = DataValidation(type="list", formula1='"Train,Flight,Rental,Private,Taxi,Public Transport,Other"', allow_blank=True,
+                             sqref=f"B2:B{cfg.travel_last}")
+    travel.data_validations.append(dv_type)
+    return travel
+
+def travel_rows_xml(cfg, currency_id, bold_id):
+    """Yield the Travel & Vehicles formula rows and the totals row as XML."""
+    render, cur = row_xml, currency_id
+    line_item, subtotal = LINE_ITEM_TMPL.format, TRAVEL_SUBTOTAL_TMPL.format
+    for row in range(2, cfg.travel_last + 1):
+        # F  Keep line items for tickets/day-rates
+        # H  Rental per-km left blank; I/K rental variable and private car suppressed:
+        #    we compute Stadtmobil centrally in Summary via the named rates to avoid double counting
+        # L  Travel subtotal
+        yield render(row, (
+            (6, line_item(r=row), cur),
+            (9, "=0", 0),
+            (11, "=0", 0),
+            (12, subtotal(r=row), cur),
+        ))
+
+    # Totals row (after one empty spare row)
+    totals = [(3, "Totals:", bold_id)]
+    for c in (6,9,11,12):
+        col = COLS[c - 1]
+        totals.append((c, f"=SUM({col}2:{col}{cfg.travel_tot - 1})", currency_id))
+    yield row_xml(cfg.travel_tot, totals)
 
 # ------------------------------
 # Sheet: Material Expenses
 # ------------------------------
-other = wb.create_sheet("Material Expenses")
-other_headers = [
-    "Date","Item / Description","Category (consumables/equipment/shipping/permits/other)",
-    "Units","Unit cost (EUR)","Line total (EUR)","Notes"
-]
-other.append(other_headers); make_header(other[1])
-set_col_width(other, [12,30,38,10,16,16,30])
-
-for row in range(2, 401):
-    other.cell(row=row, column=6).value = f"=IFERROR(D{row}*E{row},0)"
-    other.cell(row=row, column=6).style = "currency"
-
-o_tot = 402
-other.cell(row=o_tot, column=3, value="Totals:").font = bold
-other.cell(row=o_tot, column=6, value=f"=SUM(F2:F401)").style = "currency"
-other.freeze_panes = "A2"
+def add_other_sheet(wb, cfg):
+    other = wb.create_sheet("Material Expenses")
+    other_headers = [
+        "Date","Item / Description","Category (consumables/equipment/shipping/permits/other)",
+        "Units","Unit cost (EUR)","Line total (EUR)","Notes"
+    ]
+    set_col_width(other, [12,30,38,10,16,16,30])
+    other.freeze_panes = "A2"
+    other.append(make_header(other, other_headers))
+    return other
+
+def other_rows_xml(cfg, currency_id, bold_id):
+    """Yield the Material Expenses formula rows and the totals row as XML."""
+    render, cur, line_item = row_xml, currency_id, LINE_ITEM_TMPL.format
+    for row in range(2, cfg.other_last + 1):
+        yield render(row, ((6, line_item(r=row), cur),))
+
+    # Totals row (after one empty spare row)
+    yield row_xml(cfg.other_tot, ((3, "Totals:", bold_id), (6, f"=SUM(F2:F{cfg.other_tot - 1})", currency_id)))
 
 # ------------------------------
 # Sheet: Summary
 # ------------------------------
-summary = wb.create_sheet("Summary")
-set_col_width(summary, [40,22,28])
-
-summary.merge_cells("A1:C1")
-summary["A1"] = "Field Trip Cost Summary"
-summary["A1"].font = Font(bold=True, size=14)
-summary["A1"].alignment = Alignment(horizontal="center")
-
-summary.append(["","",""])  # spacer
-summary.append(["Category","Subtotal (EUR)","Notes"]); make_header(summary[3])
-
-# Staff/participants subtotals
-summary.append(["Per-diems (total)", "=IFERROR('Staff & Participants'!H302,0)", "WiMi, VA & Hiwi only; unpaid students excluded."])
-summary.append(["Overnights", "=IFERROR('Staff & Participants'!K302,0)", "Nights x cost/night."])
-summary.append(["Hiwi wages", "=IFERROR('Staff & Participants'!O302,0)", "Hours x rate if used)."])
-
-# Travel tickets (non-Stadtmobil)
-summary.append(["Tickets / day-rates (travel)", "=IFERROR('Travel & Vehicles'!F502,0)", "Trains, flights, taxis, PT, etc."])
-
-# Stadtmobil (central calc; uses your new variables)
-summary.append([
-    "Stadtmobil (cars, base + km) or lump sum",
-    "=IF(STADTMOBIL_LUMPSUM>0, STADTMOBIL_LUMPSUM, STADTMOBIL_CAR_NUMBER*STADTMOBIL_BASE + TOTAL_KM*STADTMOBIL_PER_KM)",
-    "If a lump sum is provided (>0), it overrides the calculated cost."
-])
-
-# Materials & other
-summary.append(["Materials & other", "=IFERROR('Material Expenses'!F402,0)", "Consumables, rentals, permits, shipping."])
-
-# Grand total
-summary.append(["Grand total (EUR)", "=SUM(B4:B9)", "Includes Stadtmobil and all other categories."])
-
-# Currency styling
-for r in range(4, 11):
-    summary.cell(row=r, column=2).style = "currency"
-summary.cell(row=10, column=1).font = Font(bold=True)
-summary.cell(row=10, column=2).font = Font(bold=True)
-summary.cell(row=10, column=2).style = "currency"
-
-# Notes
-summary.append(["","",""])
-summary.append(["Notes","","Set rates in 'Inputs & Rates'. Roles: WiMi, VA staff & Hiwis may receive per-diem; 'Student (unpaid)' receives overnights only."])
-
-summary.freeze_panes = "A4"
-
-# Save workbook (ensure folder exists)
-out_path = Path("output/fieldtrip-cost-template.xlsx")
-out_path.parent.mkdir(parents=True, exist_ok=True)
-wb.save(out_path)
-print(out_path)
+def add_summary_sheet(wb, cfg):
+    summary = wb.create_sheet("Summary")
+    set_col_width(summary, [40,22,28])
+    summary.freeze_panes = "A4"
+
+    summary.merged_cells.add("A1:C1")
+    title = WriteOnlyCell(summary, value="Field Trip Cost Summary")
+    title.font = title_font
+    title.alignment = center_align
+    summary.append([title])
+
+    summary.append(["","",""])  # spacer
+    summary.append(make_header(summary, ["Category","Subtotal (EUR)","Notes"]))
+
+    def summary_row(label, formula, note):
+        """Append a Summary line whose subtotal is currency-formatted."""
+        append_row(summary, [label, formula, note], styled=(2,))
+
+    # Staff/participants subtotals. Per-diems and overnights are aggregated
+    # straight from the input columns with one SUMPRODUCT each, so they do not
+    # depend on the per-row breakdowns in columns H and K.
+    def col(c):
+        return f"'Staff & Participants'!{c}2:{c}{cfg.staff_last}"
+
+    summary_row(
+        "Per-diems (total)",
+        f"=SUMPRODUCT(({col('C')}<>\"Student (unpaid)\")*({col('F')}+{col('G')}))*PER_DIEM",
+        "WiMi, VA & Hiwi only; unpaid students excluded."
+    )
+    summary_row("Overnights", f"=SUMPRODUCT({col('I')}*{col('J')})", "Nights x cost/night.")
+    summary_row("Hiwi wages", f"='Staff & Participants'!O{cfg.staff_tot}", "Hours x rate if used).")
+
+    # Travel tickets (non-Stadtmobil)
+    summary_row("Tickets / day-rates (travel)", f"='Travel & Vehicles'!F{cfg.travel_tot}", "Trains, flights, taxis, PT, etc.")
+
+    # Stadtmobil (central calc; uses your new variables)
+    summary_row(
+        "Stadtmobil (cars, base + km) or lump sum",
+        "=IF(STADTMOBIL_LUMPSUM>0, STADTMOBIL_LUMPSUM, STADTMOBIL_CAR_NUMBER*STADTMOBIL_BASE + TOTAL_KM*STADTMOBIL_PER_KM)",
+        "If a lump sum is provided (>0), it overrides the calculated cost."
+    )
+
+    # Materials & other
+    summary_row("Materials & other", f"='Material Expenses'!F{cfg.other_tot}", "Consumables, rentals, permits, shipping.")
+
+    # Grand total (bold, currency)
+    total_label = WriteOnlyCell(summary, value="Grand total (EUR)")
+    total_label.font = bold
+    total_value = WriteOnlyCell(summary, value="=SUM(B4:B9)")
+    total_value.number_format = CURRENCY_FMT
+    total_value.font = bold
+    summary.append([total_label, total_value, "Includes Stadtmobil and all other categories."])
+
+    # Notes
+    summary.append(["","",""])
+    summary.append(["Notes","","Set rates in 'Inputs & Rates'. Roles: WiMi, VA staff & Hiwis may receive per-diem; 'Student (unpaid)' receives overnights only."])
+    return summary
+
+# ------------------------------
+# Workbook
+# ------------------------------
+def _render_rows(rows_xml, cfg, currency_id, bold_id):
+    """Render all XML rows of one sheet into a single string (worker process entry point)."""
+    return "".join(rows_xml(cfg, currency_id, bold_id))
+
+def build_workbook(cfg, out, workers=1):
+    """
+    Build the field trip workbook for ``cfg`` and write it to ``out``
+    (a file path or a writable binary stream).
+
+    With ``workers > 1`` the XML rows of the bulk sheets are rendered in
+    parallel worker processes. This only pays off for large row counts;
+    for the default template, process start-up outweighs the rendering.
+    """
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+
+    add_rates_sheet(wb)
+    staff = add_staff_sheet(wb, cfg)
+    hours = add_hours_sheet(wb, cfg)
+    travel = add_travel_sheet(wb, cfg)
+    other = add_other_sheet(wb, cfg)
+    add_summary_sheet(wb, cfg)
+
+    # cellXfs indices shared by all XML-rendered rows
+    currency_id = style_id(staff, number_format=CURRENCY_FMT)
+    bold_id = style_id(staff, font=bold)
+
+    # The bulk sheets do not depend on each other (Summary only references
+    # them through formulas), so their rows can be rendered independently.
+    row_builders = {
+        staff: staff_rows_xml,
+        hours: hours_rows_xml,
+        travel: travel_rows_xml,
+        other: other_rows_xml,
+    }
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(row_builders))) as pool:
+            futures = {
+                ws: pool.submit(_render_rows, rows_xml, cfg, currency_id, bold_id)
+                for ws, rows_xml in row_builders.items()
+            }
+            bodies = {ws: (future.result(),) for ws, future in futures.items()}
+    else:
+        bodies = {ws: rows_xml(cfg, currency_id, bold_id) for ws, rows_xml in row_builders.items()}
+
+    write_workbook(wb, out, bodies)
+
+
+def positive_int(text):
+    """argparse type accepting integers >= 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive row count, got {value}")
+    return value
+
+def parse_args(argv=None):
+    """Parse the number of pre-filled rows per sheet and worker processes from the command line."""
+    parser = argparse.ArgumentParser(description="Generate the field trip cost workbook.")
+    parser.add_argument("--staff-rows", type=positive_int, default=Config.staff_rows,
+                        help="participant rows pre-filled with formulas (default: %(default)s)")
+    parser.add_argument("--hours-rows", type=positive_int, default=Config.hours_rows,
+                        help="Hours Log rows aggregated into Staff & Participants (default: %(default)s)")
+    parser.add_argument("--travel-rows", type=positive_int, default=Config.travel_rows,
+                        help="travel rows pre-filled with formulas (default: %(default)s)")
+    parser.add_argument("--material-rows", type=positive_int, default=Config.material_rows,
+                        help="material expense rows pre-filled with formulas (default: %(default)s)")
+    parser.add_argument("--workers", type=positive_int, default=1,
+                        help="processes rendering the sheet rows in parallel (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = vars(parse_args(argv))
+    workers = args.pop("workers")
+    cfg = Config(**args)
+
+    # Save workbook (ensure folder exists)
+    out_path = Path("output/fieldtrip-cost-template.xlsx")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    build_workbook(cfg, out_path, workers=workers)
+    print(out_path)
+
+
+if __name__ == "__main__":
+    main()